@@ -3,13 +3,26 @@
 
 import json
 import logging
+import os
+import re
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from math import ceil
 from pathlib import Path
+from queue import Queue
 from time import time
 from optparse import OptionParser
 
 from ibroadcast import iBroadcast
 
+try:
+    import orjson # optional; faster (de)serialization of playlist sync metadata
+except ImportError:
+    orjson = None
+
 from beets import config # for reading playlist plugin configuration
 from beets.library import Library
 from beets.plugins import BeetsPlugin
@@ -18,6 +31,9 @@ from beets.util import syspath, displayable_path
 
 from beetsplug.ibroadcast import common
 
+# Blank and comment (#EXTM3U, #EXTINF, ...) lines of M3U playlists.
+_M3U_SKIP_LINE = re.compile(r'\s*(#|$)')
+
 
 class IBroadcastCommand(Subcommand):
     plugin: BeetsPlugin = None
@@ -26,9 +42,16 @@ class IBroadcastCommand(Subcommand):
     parser: OptionParser = None
     ib = None
     tags = None
+    lock = None
+    trackid_to_tagids = None
+    sync_tags = True
+    _tag_ops = None
+    _dir_files = None
+    _lastsync_dirty = False
 
     def __init__(self, plugin):
         self.plugin = plugin
+        self.lock = threading.RLock()
 
         self.parser = OptionParser(
             usage='beet {plg} [options] [QUERY...]'.format(
@@ -79,12 +102,21 @@ class IBroadcastCommand(Subcommand):
             return
 
         items = []
-        for item in lib.items(query):
-            items.append(item)
-            if opts.pretend:
+        if opts.pretend:
+            for item in lib.items(query):
+                items.append(item)
                 self.pretend(item, force=opts.force)
-            else:
-                self.upload(item, force=opts.force)
+        else:
+            def queried_items():
+                for item in lib.items(query):
+                    items.append(item)
+                    yield item
+            # Collect tag changes across all tracks, to send one request per tag.
+            self._tag_ops = defaultdict(list)
+            try:
+                self._upload_concurrently(queried_items(), force=opts.force)
+            finally:
+                self._flush_tag_ops()
 
         if opts.sync_playlists:
             self.sync_playlists(items, pretend=opts.pretend)
@@ -102,20 +134,40 @@ class IBroadcastCommand(Subcommand):
         self.plugin._log.debug('Connecting to iBroadcast')
         username = self.plugin.config['username'].get()
         password = self.plugin.config['password'].get()
-        self.ib = iBroadcast(username, password, log=self.plugin._log,
+        ib = iBroadcast(username, password, log=self.plugin._log,
             client='beets-ibroadcast', version=common.plg_ns['__version__'])
+        self.sync_tags = self.plugin.config['sync_tags'].get(bool)
+
+        if self.sync_tags:
+            # Reorganize the tags to be keyed on name rather than ID.
+            # This helps to achieve harmony with the usertag plugin.
+            tags = {}
+            for tagid, tag in ib.tags.items():
+                tagcopy = tag.copy()
+                tagname = tagcopy.pop('name')
+                tagcopy['id'] = tagid
+                if tagname in tags:
+                    self.plugin._log.warning(f"Ignoring duplicate tag '{tagname}' with ID {tagid}.")
+                else:
+                    tags[tagname] = tagcopy
+            self.tags = tags
+
+            self.trackid_to_tagids = self._index_remote_tags(ib)
+
+        # Publish the client last: upload threads take a set self.ib
+        # to mean that everything above is ready to use.
+        self.ib = ib
 
-        # Reorganize the tags to be keyed on name rather than ID.
-        # This helps to achieve harmony with the usertag plugin.
-        self.tags = {}
-        for tagid, tag in self.ib.tags.items():
-            tagcopy = tag.copy()
-            tagname = tagcopy.pop('name')
-            tagcopy['id'] = tagid
-            if tagname in self.tags:
-                self.plugin._log.warning(f"Ignoring duplicate tag '{tagname}' with ID {tagid}.")
-            else:
-                self.tags[tagname] = tagcopy
+    @staticmethod
+    def _index_remote_tags(ib):
+        # Invert the tags' track lists once, rather than scanning all of them
+        # for every track, as iBroadcast.gettags does.
+        trackid_to_tagids = {}
+        for tagid, tag in ib.tags.items():
+            # Like iBroadcast.istagged, count a tag without a track list as empty.
+            for trackid in tag.get('tracks') or ():
+                trackid_to_tagids.setdefault(int(trackid), set()).add(tagid)
+        return trackid_to_tagids
 
     def _verbose(self):
         return self.plugin._log.level <= logging.DEBUG
@@ -135,12 +187,13 @@ class IBroadcastCommand(Subcommand):
 
     @staticmethod
     def _trackid(item):
-        return int(item.ib_trackid) if hasattr(item, 'ib_trackid') else None
+        trackid = item.get('ib_trackid')
+        return None if trackid is None else int(trackid)
 
     @staticmethod
+    @lru_cache(maxsize=65536)
     def _path(path):
-        if type(path) == bytes: path = path.decode()
-        return Path(str(path)).resolve()
+        return Path(os.fsdecode(path)).resolve()
 
     ## -- UPLOADS --
 
@@ -162,10 +215,12 @@ class IBroadcastCommand(Subcommand):
             self._connect()
 
         trackid = self._trackid(item)
+        changed = False
         if force or self._needs_upload(item):
+            path = item.path
             try:
-                new_trackid = self.ib.upload(syspath(item.path),
-                                             label=displayable_path(item.path),
+                new_trackid = self.ib.upload(syspath(path),
+                                             label=displayable_path(path),
                                              force=force)
             except Exception as e:
                 self.plugin._log.error(f'Error uploading track: {item}')
@@ -180,17 +235,73 @@ class IBroadcastCommand(Subcommand):
                         self.plugin._log.error(f'Error trashing previously uploaded iBroadcast track {trackid}.')
                         self._stack_trace(e)
                 self._update_track(item, new_trackid)
+                changed = True
                 trackid = new_trackid
                 self.plugin._log.debug(f'Upload complete: {item}')
             else:
                 self.plugin._log.warning(f'Not uploaded: {item}')
 
-        if trackid:
-            self._sync_tags(trackid, item)
+        # Store upload and tag changes together, in a single write.
+        try:
+            if trackid and self.sync_tags:
+                changed = self._sync_tags(trackid, item) or changed
+        finally:
+            if changed:
+                item.store()
+
+    def _upload_concurrently(self, items, force=False):
+        # Uploads are network bound, so run several of them at once. Items are
+        # fed through a bounded queue, so that reading the library overlaps
+        # with uploading, but never runs far ahead of it.
+
+        # Log in once, here, rather than racing to do so from every worker.
+        if self.ib is None:
+            self._connect()
+        if not force and not getattr(self.ib, 'md5', True):
+            # The client downloads its checksum list lazily, on first upload,
+            # without any locking; fetch it once before the workers start.
+            self.ib._download_md5s()
+
+        concurrency = max(1, self.plugin.config['concurrency'].get(int))
+        queue = Queue(maxsize=2 * concurrency)
+        failed = threading.Event()
+        errors = []
+
+        def worker():
+            while True:
+                item = queue.get()
+                if item is None:
+                    return
+                if failed.is_set():
+                    # Drain the queue without uploading anything further.
+                    continue
+                try:
+                    self.upload(item, force=force)
+                except Exception as e:
+                    failed.set()
+                    errors.append(e)
+                    self.plugin._log.error(f'Error syncing track: {item}')
+                    self._stack_trace(e)
+
+        workers = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in workers:
+            thread.start()
+        try:
+            for item in items:
+                if failed.is_set():
+                    break
+                queue.put(item)
+        finally:
+            for thread in workers:
+                queue.put(None)
+            for thread in workers:
+                thread.join()
+        if errors:
+            raise errors[0]
 
     def _needs_upload(self, item):
         utime = self._uploadtime(item)
-        needs_upload = item.mtime > common.safeint(utime, -1)
+        needs_upload = item.mtime > utime
         if self._verbose():
             msg = 'Needs upload' if needs_upload else 'Already uploaded'
             self.plugin._log.debug(f'{msg}: {item} [mtime={item.mtime}; utime={utime}]')
@@ -205,51 +316,52 @@ class IBroadcastCommand(Subcommand):
 
     @staticmethod
     def _uploadtime(item):
-        return int(item.ib_uploadtime) if hasattr(item, 'ib_uploadtime') else -1
+        return int(item.get('ib_uploadtime', -1))
 
     @staticmethod
     def _update_track(item, trackid):
         item.ib_trackid = 0 if not trackid else trackid
         item.ib_uploadtime = ceil(time())
-        item.store()
 
     ## -- TAGS --
 
     def _sync_tags(self, trackid, item):
-        local_tagids = set(self._local_tagids(item))
-        remote_tagids = set(self._remote_tagids(trackid))
-        lastsync_tagids = set(self._lastsync_tagids(item))
+        local_tagids = self._local_tagids(item)
+        remote_tagids = self._remote_tagids(trackid)
+        lastsync_tagids = self._lastsync_tagids(item)
+        if not (local_tagids or remote_tagids or lastsync_tagids):
+            # Track is untagged everywhere; nothing to sync.
+            return False
+
+        previous_tagids = set(lastsync_tagids)
 
-        self._assert_element_type(local_tagids, str)
-        self._assert_element_type(remote_tagids, str)
-        self._assert_element_type(lastsync_tagids, str)
+        if __debug__:
+            self._assert_element_type(local_tagids, str)
+            self._assert_element_type(remote_tagids, str)
+            self._assert_element_type(lastsync_tagids, str)
 
         locally_added = local_tagids - lastsync_tagids
         locally_removed = lastsync_tagids - local_tagids
         remotely_added = remote_tagids - lastsync_tagids
         remotely_removed = lastsync_tagids - remote_tagids
 
-        if locally_added or locally_removed or remotely_added or remotely_removed:
-            self.plugin._log.debug(f'Syncing tags for {item}')
+        if not (locally_added or locally_removed or remotely_added or remotely_removed):
+            # Local, remote and last-synced tags all agree; usertags already
+            # names exactly these tags, so there is nothing to rewrite.
+            return False
+
+        self.plugin._log.debug(f'Syncing tags for {item}')
 
         for tagid in locally_added:
             self.plugin._log.debug(f"--> Adding remote tag '{self._tagname(tagid)}' [{tagid}]")
 
-            try:
-                self.ib.tagtracks(tagid, [trackid])
+            if self._tagtracks(tagid, trackid, item):
                 lastsync_tagids.add(tagid)
-            except Exception as e:
-                self.plugin._log.error(f"Error tagging iBroadcast track {trackid} with tag '{self._tagname(tagid)}' [{tagid}].")
-                self._stack_trace(e)
 
         for tagid in locally_removed:
             self.plugin._log.debug(f"--> Removing remote tag '{self._tagname(tagid) or '[deleted tag]'}' [{tagid}]")
-            try:
-                self.ib.tagtracks(tagid, [trackid], untag=True)
+            if self._tagtracks(tagid, trackid, item, untag=True):
                 lastsync_tagids.remove(tagid)
-            except Exception as e:
-                self.plugin._log.error(f"Error untagging iBroadcast track {trackid} with tag '{self._tagname(tagid)}' [{tagid}].")
-                self._stack_trace(e)
 
         for tagid in remotely_added:
             self.plugin._log.debug(f"--> Adding local tag '{self._tagname(tagid)}' [{tagid}]")
@@ -262,47 +374,107 @@ class IBroadcastCommand(Subcommand):
                 # then the id was already removed from the set.
                 lastsync_tagids.remove(tagid)
 
-        self._update_tags(item, lastsync_tagids)
+        synced_tagids = lastsync_tagids
+        if self._tag_ops is not None:
+            # Queued remote changes are not synced yet; _flush_tag_ops
+            # records them in ib_tagids once iBroadcast has accepted them.
+            synced_tagids = (lastsync_tagids - locally_added) | locally_removed
+
+        return self._update_tags(item, lastsync_tagids, previous_tagids, synced_tagids)
+
+    def _tagtracks(self, tagid, trackid, item, untag=False):
+        if self._tag_ops is not None:
+            # Batching: queue the change, to be sent by _flush_tag_ops.
+            with self.lock:
+                self._tag_ops[(tagid, untag)].append((trackid, item))
+            return True
+        try:
+            self.ib.tagtracks(tagid, [trackid], untag=untag)
+            return True
+        except Exception as e:
+            action = 'untagging' if untag else 'tagging'
+            self.plugin._log.error(f"Error {action} iBroadcast track {trackid} with tag '{self._tagname(tagid)}' [{tagid}].")
+            self._stack_trace(e)
+            return False
+
+    def _flush_tag_ops(self, batch_size=200):
+        tag_ops, self._tag_ops = self._tag_ops, None
+        synced_items = {}
+        for (tagid, untag), ops in tag_ops.items():
+            for i in range(0, len(ops), batch_size):
+                batch = ops[i:i + batch_size]
+                trackids = [trackid for trackid, _ in batch]
+                try:
+                    self.ib.tagtracks(tagid, trackids, untag=untag)
+                except Exception as e:
+                    action = 'untagging' if untag else 'tagging'
+                    self.plugin._log.error(f"Error {action} iBroadcast tracks {trackids} with tag '{self._tagname(tagid)}' [{tagid}].")
+                    self._stack_trace(e)
+                    # Leave the last-sync state alone, so the change is retried next time.
+                    continue
+                for _, item in batch:
+                    tagids = self._lastsync_tagids(item)
+                    if untag:
+                        tagids.discard(tagid)
+                    else:
+                        tagids.add(tagid)
+                    item.ib_tagids = '|'.join(tagids)
+                    synced_items[id(item)] = item
+        for item in synced_items.values():
+            item.store()
 
     def _tagname(self, tagid):
-        return self.ib.tags[tagid]['name'] if tagid in self.ib.tags else None
+        tag = self.ib.tags.get(tagid)
+        return tag['name'] if tag else None
 
     def _tagid(self, tagname):
-        if tagname in self.tags:
+        tag = self.tags.get(tagname)
+        if tag:
             # Existing remote tag.
-            return self.tags[tagname]['id']
+            return tag['id']
 
-        # New remote tag -- create it.
-        self.plugin._log.debug(f"--> Creating remote tag '{tagname}'")
-        try:
-            tagid = str(self.ib.createtag(tagname))
-            self.ib.tags[tagid] = {'name': tagname}
-            self.tags[tagname] = {'id': tagid}
-            return tagid
-        except Exception as e:
-            self.plugin._log.error(f"Error creating iBroadcast tag '{tagname}'.")
-            self._stack_trace(e)
+        with self.lock:
+            if tagname in self.tags:
+                # Created meanwhile by another upload thread.
+                return self.tags[tagname]['id']
+
+            # New remote tag -- create it.
+            self.plugin._log.debug(f"--> Creating remote tag '{tagname}'")
+            try:
+                tagid = str(self.ib.createtag(tagname))
+                self.ib.tags[tagid] = {'name': tagname}
+                self.tags[tagname] = {'id': tagid}
+                return tagid
+            except Exception as e:
+                self.plugin._log.error(f"Error creating iBroadcast tag '{tagname}'.")
+                self._stack_trace(e)
 
     def _local_tagids(self, item):
         usertags = self._usertags(item)
-        return [self._tagid(tagname) for tagname in usertags.split('|')] if usertags else []
+        return {self._tagid(tagname) for tagname in usertags.split('|')} if usertags else set()
 
     def _remote_tagids(self, trackid):
-        return self.ib.gettags(trackid) if trackid else []
+        if not trackid:
+            return frozenset()
+        # A frozen copy, so that callers cannot alter the index.
+        return frozenset(self.trackid_to_tagids.get(int(trackid), ()))
 
     @staticmethod
     def _usertags(item):
-        return item.usertags if hasattr(item, 'usertags') else ''
+        return item.get('usertags', '')
 
     @staticmethod
     def _lastsync_tagids(item):
-        return item.ib_tagids.split('|') if hasattr(item, 'ib_tagids') and item.ib_tagids != '' else []
+        tagids = item.get('ib_tagids', '')
+        return set(tagids.split('|')) if tagids != '' else set()
 
-    def _update_tags(self, item, tagids):
+    def _update_tags(self, item, tagids, previous_tagids, synced_tagids=None):
         changed = False
 
-        if tagids != self._lastsync_tagids(item):
-            item.ib_tagids = '|'.join(tagids)
+        if synced_tagids is None:
+            synced_tagids = tagids
+        if synced_tagids != previous_tagids:
+            item.ib_tagids = '|'.join(synced_tagids)
             changed = True
 
         usertags = '|'.join(sorted(self._tagname(tagid) for tagid in tagids))
@@ -310,8 +482,7 @@ class IBroadcastCommand(Subcommand):
             item.usertags = usertags
             changed = True
 
-        if changed:
-            item.store()
+        return changed
 
     ## -- PLAYLISTS --
 
@@ -331,6 +502,10 @@ class IBroadcastCommand(Subcommand):
         :param pretend:     If True, report how playlists would be synced,
                             but don't actually do it.
         """
+        # Start from fresh path resolutions, in case files moved since the
+        # last sync in this process (e.g. during a long import session).
+        self._path.cache_clear()
+
         if playlists is None:
             # No playlists explicitly given; glean playlists from config.
             if 'playlist' not in config:
@@ -345,8 +520,7 @@ class IBroadcastCommand(Subcommand):
                 self.plugin._log.warning(f"Invalid playlist directory: '{playlist_dir}'")
                 return
 
-            playlists = [path for path in playlist_dir.rglob('*.m3u') if path.is_file()]
-            playlists.sort()
+            playlists = sorted(self._find_playlists(playlist_dir))
 
         if relative_to is None:
             # Interpret paths in the playlist files relative to a base
@@ -367,33 +541,68 @@ class IBroadcastCommand(Subcommand):
         pl_lastsync_path = Path(config['directory'].get()) / '.ibroadcast-playlists.json'
         if pl_lastsync_path.is_file():
             try:
-                with open(pl_lastsync_path) as f:
-                    pl_lastsync = json.load(f)
+                pl_lastsync = self._load_lastsync(pl_lastsync_path)
             except Exception as e:
                 self.plugin._log.error(f"Error parsing last-sync metadata from '{pl_lastsync_path}'.")
                 self._stack_trace(e)
                 pl_lastsync = {}
         else:
             pl_lastsync = {}
+        self._lastsync_dirty = False
 
         self.plugin._log.info(f"Syncing playlists")
 
+        # Index the items by path, so that each playlist track can be
+        # matched with a single lookup rather than a scan over all items.
+        # Skip it when there are no playlists to match against.
+        path_to_items = {}
+        if playlists:
+            for item in items:
+                path_to_items.setdefault(self._item_path(item.path), []).append(item)
+
+        # Cache of directory listings, shared by all playlists' tracks.
+        self._dir_files = {}
+
+        # Resolve track prefixes once, rather than once per playlist.
+        track_prefixes = {}
+        default_prefix = None if relative_to == 'playlist' else self._path(relative_to)
+
         # Sync local playlists.
+        local_plkeys = set()
+        local_playlists = []
         for playlist in playlists:
             path = Path(playlist)
             if not path.is_file():
                 self.plugin._log.warning(f"Skipping invalid playlist: '{path}'")
                 continue
-            track_prefix = self._path(path.parent.parent) if relative_to == 'playlist' else self._path(relative_to)
-            self._sync_playlist(items, path, track_prefix, pl_lastsync, pretend=pretend)
+            local_plkeys.add(str(path))
+            track_prefix = default_prefix
+            if track_prefix is None:
+                track_prefix = track_prefixes.get(path.parent)
+                if track_prefix is None:
+                    track_prefix = track_prefixes[path.parent] = self._path(path.parent.parent)
+            local_playlists.append((path, track_prefix))
+
+        # Parsing playlists (and resolving their track paths) is I/O bound,
+        # so overlap it across playlists, while syncing them in order.
+        with ThreadPoolExecutor(max_workers=min(16, len(local_playlists)) or 1) as executor:
+            parsed = executor.map(lambda pl: list(self._parse_m3u(*pl)), local_playlists)
+            for (path, _), track_paths in zip(local_playlists, parsed):
+                self._sync_playlist(path_to_items, path, track_paths, pl_lastsync, pretend=pretend)
 
         if pretend: return # Nothing more we can do here!
 
         # Sync remote-only playlists.
-        for playlistid in self.ib.playlists:
+        id_to_plkeys = None
+        for playlistid, ib_playlist in self.ib.playlists.items():
+            if id_to_plkeys is None:
+                # Invert the linkages once, rather than once per remote playlist.
+                id_to_plkeys = defaultdict(list)
+                for k, v in pl_lastsync.items():
+                    id_to_plkeys[v['id']].append(k)
             pid = int(playlistid)
-            plname = self.ib.playlists[playlistid]['name']
-            plkeys = [k for k, v in pl_lastsync.items() if v['id'] == pid]
+            plname = ib_playlist['name']
+            plkeys = id_to_plkeys.get(pid, [])
             if len(plkeys) > 1:
                 self.plugin._log.warning(f"Skipping sync of iBroadcast playlist '{plname}' with ID {playlistid}, " +
                     f"because it somehow became linked to multiple local playlists:" +
@@ -403,58 +612,134 @@ class IBroadcastCommand(Subcommand):
                 # Then, create M3U locally with matching name, populated with beets track paths.
                 self.plugin._log.warning(f"iBroadcast playlist '{plname}' with ID {playlistid} " +
                     "does not exist locally, and I am not smart enough to download it for you. Pull requests welcome!")
-            elif not Path(plkeys[0]).is_file():
+            elif plkeys[0] not in local_plkeys and not Path(plkeys[0]).is_file():
                 # TODO: Decide how to handle this scenario. Should the playlist be recreated?
                 # Or assume it was deleted locally, and therefore should be deleted remotely too?
                 # Probably makes sense to compare the local and remote trackids to decide.
                 self.plugin._log.warning(f"iBroadcast playlist '{plname}' with ID {playlistid} " +
                     "is linked to missing local playlist '{plkeys[0]}', and I am not smart enough to fix it for you. Pull requests welcome!")
 
-        # Persist last-synced playlist linkages for next time.
-        with open(pl_lastsync_path, 'w') as f:
-            json.dump(pl_lastsync, f)
+        # Persist last-synced playlist linkages for next time, if they changed.
+        if self._lastsync_dirty:
+            self._save_lastsync(pl_lastsync_path, pl_lastsync)
+
+    @staticmethod
+    def _find_playlists(playlist_dir):
+        # Walk with os.scandir, which knows file types without extra stat
+        # calls, and prune hidden directories (.git and friends) on the way.
+        dirs = [playlist_dir]
+        while dirs:
+            try:
+                entries = os.scandir(dirs.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith('.'):
+                            dirs.append(entry.path)
+                    elif entry.name.endswith('.m3u') and entry.is_file():
+                        yield Path(entry.path)
+
+    def _is_file(self, path):
+        # List each directory once, rather than stat'ing every track file.
+        parent = path.parent
+        names = self._dir_files.get(parent)
+        if names is None:
+            try:
+                with os.scandir(parent) as entries:
+                    names = {entry.name for entry in entries if entry.is_file()}
+            except OSError:
+                # Unlistable (e.g. execute-only) directory: stat its files instead.
+                names = False
+            self._dir_files[parent] = names
+        if names is False:
+            return path.is_file()
+        return path.name in names
 
-    def _sync_playlist(self, items, plpath, track_prefix, pl_lastsync, pretend=False):
-        # Extract track paths from playlist file.
-        with open(plpath) as pl:
-            lines = [line.strip() for line in pl.readlines()]
-        track_paths = [self._path(track_prefix / line) for line in lines if len(line) > 0 and not line.startswith('#')]
+    @staticmethod
+    def _load_lastsync(path):
+        data = path.read_bytes()
+        with common.gc_paused():
+            if orjson:
+                try:
+                    return orjson.loads(data)
+                except orjson.JSONDecodeError:
+                    # Likely escaped surrogates from undecodable playlist file
+                    # names, which orjson rejects; the json module accepts them.
+                    pass
+            return json.loads(data)
 
+    @staticmethod
+    def _save_lastsync(path, pl_lastsync):
+        # Compact, key-sorted output: cheap to produce and stable across runs.
+        with common.gc_paused():
+            data = None
+            if orjson:
+                try:
+                    data = orjson.dumps(pl_lastsync, option=orjson.OPT_SORT_KEYS)
+                except TypeError:
+                    # Playlist paths with undecodable bytes carry surrogates,
+                    # which orjson cannot encode; leave those to the json module.
+                    pass
+            if data is None:
+                data = json.dumps(pl_lastsync, separators=(',', ':'), sort_keys=True).encode()
+        # Write the whole file in one go to a temporary sibling, then swap it
+        # into place, so an interrupted sync cannot leave truncated metadata.
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def _item_path(self, path):
+        # Resolve each directory only once (an album's tracks share one), and
+        # merely check whether the file itself is a symlink needing resolution.
+        parent, name = os.path.split(os.fsdecode(path))
+        path = self._path(parent) / name
+        return self._path(path) if path.is_symlink() else path
+
+    def _parse_m3u(self, plpath, track_prefix):
+        # Stream the file line by line. Universal newlines accept \n, \r\n and
+        # bare \r line endings alike, and surrogateescape decodes file names
+        # the same way os.fsdecode does, even if they are not valid UTF-8.
+        prefix = str(track_prefix)
+        with open(plpath, encoding=sys.getfilesystemencoding(), errors='surrogateescape') as pl:
+            for line in pl:
+                if not _M3U_SKIP_LINE.match(line):
+                    yield self._path(os.path.join(prefix, line.strip()))
+
+    def _sync_playlist(self, path_to_items, plpath, track_paths, pl_lastsync, pretend=False):
         # Convert track paths to iBroadcast trackids.
         track_results = []
         hints_to_fix = set()
         non_matching_tracks = 0
         local_trackids = []
-        number_width = len(str(len(track_paths)))
         for track_path in track_paths:
-            no = len(track_results) + 1
-
             # Fail fast if track file does not exist.
-            if not track_path.is_file():
-                track_results.append(f'  {no:{number_width}}. [ INVALID FILE  ] {track_path}')
+            if not self._is_file(track_path):
+                track_results.append((' ', ' INVALID FILE  ', track_path))
                 continue
 
             # Match track path to beets track item.
-            track_items = [item for item in items if self._path(item.path) == track_path]
+            track_items = path_to_items.get(track_path, [])
             if len(track_items) == 0:
                 non_matching_tracks += 1
-                track_results.append(f'  {no:{number_width}}. [  NOT IN QUERY  ] {track_path}')
+                track_results.append((' ', '  NOT IN QUERY  ', track_path))
                 hints_to_fix.add("\nPlease make sure all tracks in the playlist are imported to beets, " +
                     "and that your query is broad enough to match all tracks of this playlist.")
                 continue
             elif len(track_items) > 1:
-                track_results.append(f'- {no:{number_width}}. [MULTIPLE MATCHES] {track_path}')
+                track_results.append(('-', 'MULTIPLE MATCHES', track_path))
                 continue
             track_item = next(iter(track_items))
 
             # Match beets track item to iBroadcast trackid.
             trackid = self._trackid(track_item)
             if not trackid:
-                track_results.append(f'  {no:{number_width}}. [  NOT UPLOADED  ] {track_path}')
+                track_results.append((' ', '  NOT UPLOADED  ', track_path))
                 hints_to_fix.add("\nPlease upload all the playlist's tracks to iBroadcast before syncing it.")
                 continue
 
-            track_results.append(f'  {no:{number_width}}. [       OK       ] {track_path}')
+            track_results.append((' ', '       OK       ', track_path))
             local_trackids.append(trackid)
 
         if non_matching_tracks == len(track_paths):
@@ -463,7 +748,11 @@ class IBroadcastCommand(Subcommand):
             return
         elif len(local_trackids) < len(track_paths):
             # Some of the tracks of the playlist matched, but not all of them.
-            self.plugin._log.debug(f"Skipping sync of playlist '{plpath}' with track problems:\n" + '\n'.join(track_results) + ''.join(hints_to_fix))
+            # Format the per-track report only when it is actually shown.
+            number_width = len(str(len(track_paths)))
+            report = '\n'.join(f'{mark} {no:{number_width}}. [{status}] {track_path}'
+                for no, (mark, status, track_path) in enumerate(track_results, 1))
+            self.plugin._log.debug(f"Skipping sync of playlist '{plpath}' with track problems:\n" + report + ''.join(hints_to_fix))
             return
 
         playlistid = playlist_name = lastsync_trackids = None
@@ -506,6 +795,11 @@ class IBroadcastCommand(Subcommand):
         local_changes = local_trackids != lastsync_trackids
         remote_changes = remote_trackids != lastsync_trackids
 
+        if local_changes and remote_changes and local_trackids == remote_trackids:
+            # Both sides were changed in the same way; they already agree.
+            lastsync_trackids = local_trackids
+            local_changes = remote_changes = False
+
         if local_changes and remote_changes:
             self.plugin._log.warning(f"Skipping sync of playlist '{plpath}' (iBroadcast ID {playlistid}) with both local and remote changes.")
             self.plugin._log.debug(f'* remote_trackids = {remote_trackids}')
@@ -535,4 +829,7 @@ class IBroadcastCommand(Subcommand):
             self.plugin._log.debug(f"Skipping sync of unchanged playlist '{plpath}' (iBroadcast ID {playlistid}).")
 
         # Update last-synced playlists metadata.
-        pl_lastsync[plkey] = {'id': playlistid, 'tracks': lastsync_trackids}
+        plstate = {'id': playlistid, 'tracks': lastsync_trackids}
+        if pl_lastsync.get(plkey) != plstate:
+            pl_lastsync[plkey] = plstate
+            self._lastsync_dirty = True
@@ -1,8 +1,10 @@
 # This is free and unencumbered software released into the public domain.
 # See https://unlicense.org/ for details.
 
+import gc
 import logging
 import os
+from contextlib import contextmanager
 
 # Get values as: plg_ns['__PLUGIN_NAME__']
 plg_ns = {}
@@ -21,8 +23,14 @@ def say(msg, log_only=True, is_error=False):
     __logger__.log(level=_level, msg=msg)
 
 
-def safeint(v, otherwise):
+@contextmanager
+def gc_paused():
+    # Building many small containers at once (e.g. when decoding JSON)
+    # triggers repeated, pointless GC passes; suspend them meanwhile.
+    enabled = gc.isenabled()
+    gc.disable()
     try:
-        return int(v)
-    except ValueError:
-        return otherwise
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -0,0 +1,96 @@
+# This is free and unencumbered software released into the public domain.
+# See https://unlicense.org/ for details.
+
+from collections import defaultdict
+
+from beets.library import Item
+
+from beetsplug.ibroadcast import IBroadcastPlugin
+from beetsplug.ibroadcast.command import IBroadcastCommand
+from test.helper import TestHelper
+
+
+class StubIBroadcast(object):
+    """Stands in for the iBroadcast client, recording tag requests.
+    """
+
+    def __init__(self, tags, fail=False):
+        self.tags = tags
+        self.fail = fail
+        self.requests = []
+
+    def tagtracks(self, tagid, trackids, untag=False):
+        self.requests.append((tagid, trackids, untag))
+        if self.fail:
+            raise ConnectionError('iBroadcast is unreachable')
+
+
+class TagFlushTest(TestHelper):
+    """Test that batched tag changes are only recorded once sent.
+    """
+
+    def _command(self, ib):
+        command = IBroadcastCommand(IBroadcastPlugin())
+        command.ib = ib
+        command.tags = {tag['name']: {'id': tagid} for tagid, tag in ib.tags.items()}
+        command.trackid_to_tagids = command._index_remote_tags(ib)
+        command._tag_ops = defaultdict(list)
+        return command
+
+    def _item(self, usertags, ib_tagids):
+        item = Item(path=b'/music/track.mp3', title='track', mtime=1)
+        self.lib.add(item)
+        item.ib_trackid = 1
+        item.ib_uploadtime = 2
+        item.usertags = usertags
+        item.ib_tagids = ib_tagids
+        item.store()
+        return item
+
+    def _stored(self, item):
+        stored = self.lib.get_item(item.id)
+        return stored.get('usertags'), stored.get('ib_tagids')
+
+    def test_flush_records_sent_tag(self):
+        ib = StubIBroadcast({'10': {'name': 'fav', 'tracks': []}})
+        command = self._command(ib)
+        item = self._item('fav', '')
+
+        command.upload(item)
+        self.assertEqual(self._stored(item), ('fav', ''))
+
+        command._flush_tag_ops()
+        self.assertEqual(ib.requests, [('10', [1], False)])
+        self.assertEqual(self._stored(item), ('fav', '10'))
+
+    def test_flush_records_sent_untag(self):
+        ib = StubIBroadcast({'10': {'name': 'fav', 'tracks': [1]}})
+        command = self._command(ib)
+        item = self._item('', '10')
+
+        command.upload(item)
+        self.assertEqual(self._stored(item), ('', '10'))
+
+        command._flush_tag_ops()
+        self.assertEqual(ib.requests, [('10', [1], True)])
+        self.assertEqual(self._stored(item), ('', ''))
+
+    def test_failed_flush_keeps_tag_pending(self):
+        ib = StubIBroadcast({'10': {'name': 'fav', 'tracks': []}}, fail=True)
+        command = self._command(ib)
+        item = self._item('fav', '')
+
+        command.upload(item)
+        command._flush_tag_ops()
+        self.assertEqual(ib.requests, [('10', [1], False)])
+        self.assertEqual(self._stored(item), ('fav', ''))
+
+    def test_failed_flush_keeps_untag_pending(self):
+        ib = StubIBroadcast({'10': {'name': 'fav', 'tracks': [1]}}, fail=True)
+        command = self._command(ib)
+        item = self._item('', '10')
+
+        command.upload(item)
+        command._flush_tag_ops()
+        self.assertEqual(ib.requests, [('10', [1], True)])
+        self.assertEqual(self._stored(item), ('', '10'))
@@ -0,0 +1,125 @@
+# This is free and unencumbered software released into the public domain.
+# See https://unlicense.org/ for details.
+
+import os
+from pathlib import Path
+
+from beetsplug.ibroadcast import IBroadcastPlugin
+from beetsplug.ibroadcast.command import IBroadcastCommand
+from test.helper import TestHelper
+
+
+class FindPlaylistsTest(TestHelper):
+    """Test discovery of playlist files beneath the playlist directory.
+    """
+
+    def setUp(self):
+        super(FindPlaylistsTest, self).setUp()
+        self.playlist_dir = Path(self.mkdtemp())
+
+    def _touch(self, relpath):
+        path = self.playlist_dir / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+        return path
+
+    def _found(self):
+        return sorted(IBroadcastCommand._find_playlists(self.playlist_dir))
+
+    def test_finds_nested_playlists(self):
+        top = self._touch('top.m3u')
+        nested = self._touch('a/b/nested.m3u')
+        self._touch('a/notes.txt')
+        self._touch('a/b/other.m3u8')
+        self.assertEqual(self._found(), [nested, top])
+
+    def test_skips_hidden_directories(self):
+        visible = self._touch('visible.m3u')
+        self._touch('.git/hidden.m3u')
+        self._touch('.cache/deeper/hidden.m3u')
+        self.assertEqual(self._found(), [visible])
+
+    def test_does_not_follow_symlinked_directories(self):
+        elsewhere = Path(self.mkdtemp())
+        (elsewhere / 'linked.m3u').touch()
+        os.symlink(elsewhere, self.playlist_dir / 'link')
+        self.assertEqual(self._found(), [])
+
+    def test_includes_symlinked_playlist_files(self):
+        target = Path(self.mkdtemp()) / 'target.m3u'
+        target.touch()
+        link = self.playlist_dir / 'link.m3u'
+        os.symlink(target, link)
+        self.assertEqual(self._found(), [link])
+
+
+class ParseM3UTest(TestHelper):
+    """Test reading track paths from M3U playlist files.
+    """
+
+    def setUp(self):
+        super(ParseM3UTest, self).setUp()
+        self.command = IBroadcastCommand(IBroadcastPlugin())
+        self.music_dir = Path(self.mkdtemp()).resolve()
+        self.playlist = Path(self.mkdtemp()) / 'playlist.m3u'
+
+    def _parse(self, content):
+        self.playlist.write_bytes(content)
+        return list(self.command._parse_m3u(self.playlist, self.music_dir))
+
+    def _tracks(self, *relpaths):
+        return [self.music_dir / relpath for relpath in relpaths]
+
+    def test_line_endings(self):
+        expected = self._tracks('a.mp3', 'b.mp3')
+        self.assertEqual(self._parse(b'a.mp3\nb.mp3\n'), expected)
+        self.assertEqual(self._parse(b'a.mp3\r\nb.mp3\r\n'), expected)
+        self.assertEqual(self._parse(b'a.mp3\rb.mp3\r'), expected)
+        self.assertEqual(self._parse(b'a.mp3\nb.mp3'), expected)
+
+    def test_skips_blank_and_comment_lines(self):
+        content = (b'#EXTM3U\n'
+                   b'#EXTINF:123,Artist - Title\n'
+                   b'a.mp3\n'
+                   b'\n'
+                   b'   \t\n'
+                   b'  # indented comment\n'
+                   b'sub/b.mp3\n')
+        self.assertEqual(self._parse(content), self._tracks('a.mp3', 'sub/b.mp3'))
+
+    def test_strips_surrounding_whitespace(self):
+        self.assertEqual(self._parse(b'  a.mp3 \t\n'), self._tracks('a.mp3'))
+
+    def test_absolute_paths_ignore_prefix(self):
+        track = self.music_dir / 'abs.mp3'
+        self.assertEqual(self._parse(os.fsencode(track) + b'\n'), [track])
+
+    def test_non_ascii_paths(self):
+        self.assertEqual(self._parse('Sigur Rós/Hoppípolla.mp3\n'.encode()),
+                         self._tracks('Sigur Rós/Hoppípolla.mp3'))
+
+    def test_undecodable_paths(self):
+        self.assertEqual(self._parse(b'caf\xe9.mp3\n'),
+                         self._tracks(os.fsdecode(b'caf\xe9.mp3')))
+
+
+class LastSyncTest(TestHelper):
+    """Test reading and writing the playlist last-sync metadata.
+    """
+
+    def setUp(self):
+        super(LastSyncTest, self).setUp()
+        self.path = Path(self.mkdtemp()) / '.ibroadcast-playlists.json'
+
+    def test_round_trip(self):
+        pl_lastsync = {'/playlists/b.m3u': {'id': 2, 'tracks': [3, 4]},
+                       '/playlists/a.m3u': {'id': 1, 'tracks': []}}
+        IBroadcastCommand._save_lastsync(self.path, pl_lastsync)
+        self.assertEqual(IBroadcastCommand._load_lastsync(self.path), pl_lastsync)
+
+    def test_undecodable_playlist_names(self):
+        # Non-UTF-8 file names decode to strings with escaped surrogates.
+        plkey = os.fsdecode(b'/playlists/caf\xe9.m3u')
+        pl_lastsync = {plkey: {'id': 1, 'tracks': [2]}}
+        IBroadcastCommand._save_lastsync(self.path, pl_lastsync)
+        self.assertEqual(IBroadcastCommand._load_lastsync(self.path), pl_lastsync)
@@ -0,0 +1,98 @@
+# This is free and unencumbered software released into the public domain.
+# See https://unlicense.org/ for details.
+
+import threading
+
+from beets.library import Item
+
+from beetsplug.ibroadcast import IBroadcastPlugin
+from beetsplug.ibroadcast.command import IBroadcastCommand
+from test.helper import TestHelper, capture_log, PLUGIN_NAME
+
+
+class StubIBroadcast(object):
+    """Stands in for the iBroadcast client, counting uploads.
+    """
+
+    def __init__(self):
+        self.md5 = None
+        self.md5_downloads = 0
+        self.uploads = []
+        self.lock = threading.Lock()
+
+    def _download_md5s(self):
+        self.md5_downloads += 1
+        self.md5 = {'d41d8cd98f00b204e9800998ecf8427e'}
+
+    def upload(self, filepath, label=None, force=False):
+        with self.lock:
+            self.uploads.append(filepath)
+            return str(len(self.uploads))
+
+
+class UploadPoolTest(TestHelper):
+    """Test uploading tracks through the pool of upload threads.
+    """
+
+    def setUp(self):
+        super(UploadPoolTest, self).setUp()
+        self.command = IBroadcastCommand(IBroadcastPlugin())
+        self.command.plugin.config['concurrency'] = 3
+        self.connects = 0
+
+    def _connect(self, ib):
+        def connect():
+            self.connects += 1
+            if ib is None:
+                raise ValueError('Invalid login.')
+            self.command.ib = ib
+            self.command.sync_tags = False
+        self.command._connect = connect
+
+    def _items(self, count):
+        items = []
+        for i in range(count):
+            item = Item(path=f'/music/track{i}.mp3'.encode(), title=f'track{i}', mtime=1)
+            self.lib.add(item)
+            items.append(item)
+        return items
+
+    def test_connects_once(self):
+        ib = StubIBroadcast()
+        self._connect(ib)
+        items = self._items(20)
+
+        self.command._upload_concurrently(iter(items))
+
+        self.assertEqual(self.connects, 1)
+        self.assertEqual(ib.md5_downloads, 1)
+        self.assertEqual(len(ib.uploads), len(items))
+        trackids = {self.lib.get_item(item.id).get('ib_trackid') for item in items}
+        self.assertEqual(trackids, {str(i) for i in range(1, len(items) + 1)})
+
+    def test_failed_login_is_not_retried(self):
+        self._connect(None)
+        items = self._items(20)
+
+        with self.assertRaises(ValueError):
+            self.command._upload_concurrently(iter(items))
+        self.assertEqual(self.connects, 1)
+
+    def test_error_stops_the_pool(self):
+        # A single worker makes the point at which uploads stop predictable.
+        self.command.plugin.config['concurrency'] = 1
+        self._connect(StubIBroadcast())
+        items = self._items(100)
+        uploaded = []
+
+        def upload(item, force=False):
+            if item.title == 'track0':
+                raise RuntimeError('database is locked')
+            uploaded.append(item)
+        self.command.upload = upload
+
+        with capture_log('beets.' + PLUGIN_NAME) as logs:
+            with self.assertRaises(RuntimeError):
+                self.command._upload_concurrently(iter(items))
+        self.assertIn(f'Error syncing track: {items[0]}', '\n'.join(logs))
+        self.assertEqual(uploaded, [])
@@ -36,6 +36,9 @@ PLUGIN_VERSION = common.plg_ns['__version__']
 PACKAGE_NAME = common.plg_ns['__PACKAGE_NAME__']
 PACKAGE_TITLE = common.plg_ns['__PACKAGE_TITLE__']
 
+# Keep scratch directories in RAM where a tmpfs is available.
+TEMP_ROOT = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else None
+
 
 class LogCapture(logging.Handler):
 
@@ -118,7 +121,6 @@ class TestHelper(TestCase, Assertions):
                                      b'config')
     _test_fixture_dir = os.path.join(bytestring_path(os.path.dirname(__file__)),
                                      b'fixtures')
-    _test_target_dir = bytestring_path("/tmp/beets-autofix")
 
     def setUp(self):
         """Setup required for running test. Must be called before running any
@@ -153,13 +155,17 @@ class TestHelper(TestCase, Assertions):
         self.config['threaded'] = False
         self.config['import']['copy'] = False
 
-        os.makedirs(self._test_target_dir, exist_ok=True)
+        # Per-test target directory, so tests can run in parallel.
+        self._test_target_dir = bytestring_path(self.mkdtemp())
 
         libdir = self.mkdtemp()
         self.config['directory'] = libdir
         self.libdir = bytestring_path(libdir)
 
-        self.lib = beets.library.Library(':memory:', self.libdir)
+        # A file, rather than ':memory:', which would give each thread its
+        # own empty database.
+        self.lib = beets.library.Library(
+            os.path.join(self.mkdtemp(), 'library.db'), self.libdir)
 
         # This will initialize (create instance) of the plugins
         plugins.find_plugins()
@@ -167,8 +173,6 @@ class TestHelper(TestCase, Assertions):
     def teardown_beets(self):
         self.unload_plugins()
 
-        shutil.rmtree(self._test_target_dir, ignore_errors=True)
-
         if hasattr(self, '_tempdirs'):
             for tempdir in self._tempdirs:
                 if os.path.exists(tempdir):
@@ -190,7 +194,7 @@ class TestHelper(TestCase, Assertions):
     def mkdtemp(self):
         # This return a str path, i.e. Unicode on Python 3. We need this in
         # order to put paths into the configuration.
-        path = tempfile.mkdtemp()
+        path = tempfile.mkdtemp(dir=TEMP_ROOT)
         self._tempdirs.append(path)
         return path
 